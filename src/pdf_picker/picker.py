@@ -1,80 +1,388 @@
 #!/usr/bin/env python
 
+import contextlib
+import functools
+import hashlib
+import os
+import pickle
 import re
 import shlex
+import shutil
+import stat
+import struct
 import subprocess
-from os.path import expandvars
-from typing import NoReturn, Optional
+import sys
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice, repeat
+from os.path import basename, expandvars
+from typing import (
+    BinaryIO,
+    Callable,
+    Iterable,
+    NamedTuple,
+    NoReturn,
+    Optional,
+)
+
+# Absolute paths of external programs, see `_resolve`.
+_TOOL_CACHE: dict[str, Optional[str]] = {}
+
+# Buffer size of pipes to subprocesses and number of lines which are
+# written to them at once.
+_PIPE_BUFSIZE = 64 * 1024
+_PIPE_BATCH_LINES = 128
+
+# Bump whenever the format of cached tables of contents changes, so that
+# old entries are ignored.
+_TOC_CACHE_VERSION = 1
+# Types of values of TOC destinations which are stored in the cache.
+_PLAIN_TYPES = (str, bytes, int, float, bool, type(None), tuple)
+
+_LEADING_DIGITS = re.compile(rb"\d*")
+# Placeholders in the pdf viewer arguments and the index of the
+# corresponding value in a position.
+_POSITION_RE = re.compile(r"\$(page|xloc|yloc)")
+_POSITION_FIELDS = {"page": 0, "xloc": 1, "yloc": 2}
+
+# Minimum number of independent subtrees per thread when walking the
+# directory tree, so that the work is spread evenly among the threads.
+_WALK_ROOTS_PER_WORKER = 4
+
+# Reading directories through the raw `getdents64` syscall with a large
+# buffer needs far fewer syscalls than `readdir` (and hence `os.scandir`)
+# on huge directories. This is only available on Linux and requires the
+# syscall number for the current architecture.
+_SYS_GETDENTS64_NUMBERS = {"x86_64": 217, "aarch64": 61, "riscv64": 61}
+_GETDENTS_BUFSIZE = 256 * 1024
+# Layout of the fixed-size head of `struct linux_dirent64`, i.e. d_ino,
+# d_off, d_reclen and d_type; the name follows directly after it.
+_DIRENT64 = struct.Struct("=QqHB")
+_DIRENT64_NAME_OFFSET = _DIRENT64.size
+_DT_UNKNOWN, _DT_DIR, _DT_REG = 0, 4, 8
+_getdents_local = threading.local()
+
+
+def split_args(string: Optional[str]) -> Optional[list[str]]:
+    """
+    Split a shell-like string, which might be None, into a list of arguments.
+    """
+    return shlex.split(string) if string is not None else None
 
-import pymupdf
+
+def merge_args(*args: Optional[list[str]]) -> Optional[list[str]]:
+    """
+    Merge lists of arguments which might be None.
+    """
+    filtered_args = [a for a in args if a is not None]
+    return [s for a in filtered_args for s in a] if filtered_args else None
 
 
-def merge_strings(*strings: str) -> Optional[str]:
+def _resolve(program: str) -> Optional[str]:
     """
-    Merge strings which might be None.
+    Look up the absolute path of `program`, searching `PATH` only once
+    per program.
     """
-    filtered_strings = [s for s in strings if s is not None]
-    return " ".join(filtered_strings) if filtered_strings else None
+    if program not in _TOOL_CACHE:
+        _TOOL_CACHE[program] = shutil.which(program)
+    return _TOOL_CACHE[program]
 
 
 def send_error(error: str) -> NoReturn:
-    print(error)
+    """
+    Report an error on stdout and as a notification, then exit right away.
+    """
+    print(error, flush=True)
+    # We don't wait for the notification to be sent and skip the regular
+    # interpreter shutdown, so that a waiting launcher (e.g. rofi or
+    # fuzzel) isn't delayed unnecessarily.
+    if (notify_send := _resolve("notify-send")) is not None:
+        try:
+            subprocess.Popen(
+                [notify_send, error],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+        except FileNotFoundError:
+            pass
+    sys.stderr.flush()
+    os._exit(1)
+
+
+def _write_lines(
+    pipe: BinaryIO, lines: Iterable[bytes], errors: list[Exception]
+) -> None:
+    """
+    Write the newline terminated `lines` to `pipe` in batches and close
+    it afterwards. Any error apart from a broken pipe is appended to
+    `errors`, so that it can be raised again by the calling thread.
+    """
     try:
-        subprocess.run(["notify-send", error])
-    except FileNotFoundError:
-        pass
-    exit(1)
+        # The process might exit before reading all of its input, e.g.
+        # because the selection was canceled early.
+        with contextlib.suppress(BrokenPipeError):
+            lines = iter(lines)
+            while batch := list(islice(lines, _PIPE_BATCH_LINES)):
+                pipe.write(b"".join(batch))
+    except Exception as e:
+        errors.append(e)
+    finally:
+        # Always close the pipe, since the process might otherwise wait
+        # for more input forever.
+        with contextlib.suppress(BrokenPipeError):
+            pipe.close()
 
 
 def try_running_subprocess(
     cmd: list[str],
     not_found_error: str = "Command not found!",
-    input: Optional[str] = None,
+    input: Optional[Iterable[bytes]] = None,
 ) -> subprocess.CompletedProcess:
+    """
+    Run `cmd` and capture its output as raw bytes. The encoded and newline
+    terminated lines of `input` are streamed to the standard input of the
+    process from a separate thread, so they never have to be joined into
+    a single string and the process can already start working with the
+    first ones (e.g. fzf displaying them) while the remaining ones are
+    still being written.
+    """
+    if not cmd or (executable := _resolve(cmd[0])) is None:
+        send_error(not_found_error)
     try:
-        result = subprocess.run(
-            cmd, capture_output=True, text=True, input=input
+        if input is None:
+            return subprocess.run(
+                cmd,
+                executable=executable,
+                capture_output=True,
+                stdin=subprocess.DEVNULL,
+            )
+        process = subprocess.Popen(
+            cmd,
+            executable=executable,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            bufsize=_PIPE_BUFSIZE,
         )
     except FileNotFoundError:
         send_error(not_found_error)
-    return result
+    errors = []
+    writer = threading.Thread(
+        target=_write_lines, args=(process.stdin, input, errors), daemon=True
+    )
+    writer.start()
+    stdout = process.stdout.read()
+    process.wait()
+    writer.join()
+    if errors:
+        raise errors[0]
+    return subprocess.CompletedProcess(cmd, process.returncode, stdout)
+
+
+def _scan_dir(
+    directory: bytes, hidden: bool = False
+) -> tuple[list[str], list[bytes]]:
+    """
+    Scan a single directory, returning the PDFs it contains as well as
+    its subdirectories.
+
+    Directory entries are read in bytes mode, so names only get decoded
+    once they are known to belong to a PDF. Hidden files and directories
+    are skipped unless `hidden` is set and symlinks are never followed.
+    """
+    pdfs, subdirs = [], []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                name = entry.name
+                if not hidden and name.startswith(b"."):
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif name.lower().endswith(b".pdf") and entry.is_file(
+                        follow_symlinks=False
+                    ):
+                        pdfs.append(os.fsdecode(entry.path))
+                except OSError:
+                    continue
+    except OSError:
+        # Unreadable directories are simply skipped, just like `fd`
+        # and `find` would do.
+        pass
+    return pdfs, subdirs
+
+
+@functools.lru_cache(maxsize=None)
+def _getdents_syscall() -> Optional[tuple[Callable, int]]:
+    """
+    Return the libc `syscall` function together with the number of the
+    `getdents64` syscall, or None if this is not supported here.
+
+    This is only set up on first use, since `--getdents` is optional.
+    """
+    if sys.platform != "linux":
+        return None
+    import ctypes
+    import platform
+
+    number = _SYS_GETDENTS64_NUMBERS.get(platform.machine())
+    if number is None:
+        return None
+    try:
+        syscall = ctypes.CDLL(None, use_errno=True).syscall
+        syscall.restype = ctypes.c_long
+    except (OSError, AttributeError):
+        return None
+    return syscall, number
+
+
+def _getdents_scan_dir(
+    directory: bytes, hidden: bool = False
+) -> tuple[list[str], list[bytes]]:
+    """
+    Same as `_scan_dir`, but read the directory using the `getdents64`
+    syscall directly with a 256 KiB buffer, instead of the roughly 32 KiB
+    `readdir` uses. Only usable if `_getdents_syscall` is supported.
+    """
+    import ctypes
+
+    syscall, number = _getdents_syscall()
+    pdfs, subdirs = [], []
+    # Every thread reuses its own buffer instead of allocating a new one
+    # for each directory.
+    buf = getattr(_getdents_local, "buf", None)
+    if buf is None:
+        buf = _getdents_local.buf = ctypes.create_string_buffer(
+            _GETDENTS_BUFSIZE
+        )
+    try:
+        fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    except OSError:
+        return pdfs, subdirs
+    try:
+        while True:
+            n = syscall(
+                ctypes.c_long(number),
+                ctypes.c_int(fd),
+                buf,
+                ctypes.c_size_t(_GETDENTS_BUFSIZE),
+            )
+            if n <= 0:
+                break
+            data = ctypes.string_at(buf, n)
+            offset = 0
+            while offset < n:
+                _, _, reclen, d_type = _DIRENT64.unpack_from(data, offset)
+                start = offset + _DIRENT64_NAME_OFFSET
+                name = data[start : data.index(b"\0", start)]
+                offset += reclen
+                if not hidden and name.startswith(b"."):
+                    continue
+                if name == b"." or name == b"..":
+                    continue
+                if d_type == _DT_REG:
+                    if name.lower().endswith(b".pdf"):
+                        pdfs.append(os.fsdecode(os.path.join(directory, name)))
+                    continue
+                path = os.path.join(directory, name)
+                if d_type == _DT_UNKNOWN:
+                    # Some filesystems don't report the file type, so we
+                    # need to ask for it explicitly.
+                    try:
+                        mode = os.lstat(path).st_mode
+                    except OSError:
+                        continue
+                    if stat.S_ISDIR(mode):
+                        subdirs.append(path)
+                    elif stat.S_ISREG(mode) and name.lower().endswith(b".pdf"):
+                        pdfs.append(os.fsdecode(path))
+                elif d_type == _DT_DIR:
+                    subdirs.append(path)
+    finally:
+        os.close(fd)
+    return pdfs, subdirs
+
+
+def _walk_subtree(
+    root: bytes, scan: Callable, hidden: bool = False
+) -> list[str]:
+    """
+    Sequentially collect the PDFs below `root` using the directory
+    scanner `scan`.
+    """
+    pdfs = []
+    stack = deque([root])
+    while stack:
+        found, subdirs = scan(stack.pop(), hidden)
+        pdfs += found
+        stack += subdirs
+    return pdfs
+
+
+def _walk_pdfs(
+    base: str, hidden: bool = False, getdents: bool = False
+) -> list[str]:
+    """
+    Recursively collect the absolute paths of all PDFs below `base`.
+
+    The tree is first expanded level by level until there are enough
+    independent subtrees to keep a pool of threads busy, even if most of
+    the files live below a single directory. Every subtree is then walked
+    sequentially by one task of the pool, so that the overhead of the pool
+    is only paid once per subtree instead of once per directory.
+    If `getdents` is set and supported, directories are read using
+    `getdents64` directly.
+    """
+    if getdents and _getdents_syscall() is not None:
+        scan = _getdents_scan_dir
+    else:
+        scan = _scan_dir
+    workers = min(32, (os.cpu_count() or 1) * 4)
+    pdfs = []
+    roots = [os.fsencode(os.path.abspath(base))]
+    while roots and len(roots) < _WALK_ROOTS_PER_WORKER * workers:
+        level, roots = roots, []
+        for directory in level:
+            found, subdirs = scan(directory, hidden)
+            pdfs += found
+            roots += subdirs
+    if not roots:
+        return pdfs
+    with ThreadPoolExecutor(max_workers=min(workers, len(roots))) as executor:
+        for found in executor.map(
+            _walk_subtree, roots, repeat(scan), repeat(hidden)
+        ):
+            pdfs += found
+    return pdfs
 
 
 def search_pdfs(
-    base_directory: str, cmd: Optional[str] = None, hidden: bool = False
+    base_directory: str,
+    cmd: Optional[list[str]] = None,
+    hidden: bool = False,
+    getdents: bool = False,
 ) -> list[str]:
     """
-    Search for PDFs in the specified base directory. By default, we
-    try to use `fd`. If it is not installed, we fall back to `find`.
+    Search for PDFs in the specified base directory. By default, the
+    directory tree is walked directly from within Python, skipping
+    hidden files unless `hidden` is set. On Linux, `getdents` makes the
+    walk read directories in large batches, which needs fewer syscalls
+    for huge directories, especially on cold caches or slow filesystems.
 
     Alternatively, the specific search command to be used can be
     supplied as `cmd`.
     """
     if cmd is not None:
-        pdfs = try_running_subprocess(shlex.split(cmd)).stdout.split("\n")[:-1]
-    else:
-        cmd = ["fd", "-I", "-t", "f", "-e", "pdf", "-a", ".", base_directory]
-        if hidden:
-            cmd += ["-H"]
-        try:
-            pdfs = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-            ).stdout.split("\n")[:-1]
-        except FileNotFoundError:
-            pdfs = subprocess.run(
-                ["find", base_directory, "-type", "f", "-name", "*.pdf"],
-                capture_output=True,
-                text=True,
-            ).stdout.split("\n")[:-1]
-
-    return pdfs
+        stdout = try_running_subprocess(cmd).stdout
+        return [os.fsdecode(p) for p in stdout.splitlines()]
+    return _walk_pdfs(base_directory, hidden=hidden, getdents=getdents)
 
 
 def select(
     items: list[str],
-    cmd: Optional[str],
+    cmd: Optional[list[str]],
     indices: bool = False,
     check: bool = True,
 ) -> int:
@@ -89,89 +397,279 @@ def select(
     """
     # fzf as the default selector
     if cmd is None:
-        cmd = "fzf --with-nth 2.."
+        cmd = ["fzf", "--with-nth", "2.."]
         indices = True
+    # Prefixing, terminating and encoding the items happens in a single
+    # pass while they are written to the selector.
     if indices:
-        for i in range(len(items)):
-            items[i] = f"{i}\t{items[i]}"
+        lines = (os.fsencode(f"{i}\t{s}\n") for i, s in enumerate(items))
+    else:
+        lines = (os.fsencode(f"{s}\n") for s in items)
     selection = try_running_subprocess(
-        shlex.split(cmd),
-        not_found_error=f"Selector ({cmd}) not found!",
-        input="\n".join(items),
+        cmd,
+        not_found_error=f"Selector ({shlex.join(cmd)}) not found!",
+        input=lines,
     ).stdout
     if indices:
-        selection = re.search(r"\d*", selection).group(0)
-    if not selection or selection == "":
+        selection = _LEADING_DIGITS.match(selection).group(0)
+    if not selection:
         if check:
             send_error("Nothing selected!")
-            exit(1)
         else:
             selection = -1
     return int(selection)
 
 
+class TocPoint(NamedTuple):
+    """
+    Coordinates of the destination of a TOC entry.
+    """
+
+    x: float
+    y: float
+
+
+def _toc_cache_file(path: str, mupdf_coordinate_space: bool) -> str:
+    """
+    Location of the cached table of contents of a PDF file.
+    """
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser(
+        "~/.cache"
+    )
+    key = os.fsencode(os.path.abspath(path))
+    if mupdf_coordinate_space:
+        key += b"\0mupdf"
+    name = hashlib.blake2b(key, digest_size=16).hexdigest()
+    return os.path.join(cache_home, "pdf-picker", "toc", name)
+
+
+def _read_toc_cache(cache_file: str, st: os.stat_result) -> Optional[list]:
+    """
+    Return the cached table of contents, if it belongs to the unchanged
+    PDF file with the stat result `st`.
+    """
+    try:
+        with open(cache_file, "rb") as f:
+            entry = pickle.load(f)
+        if (
+            entry["version"] == _TOC_CACHE_VERSION
+            and entry["mtime"] == st.st_mtime_ns
+            and entry["size"] == st.st_size
+        ):
+            return [
+                [lvl, title, page, {**dest, "to": TocPoint(*dest["to"])}]
+                for lvl, title, page, dest in entry["toc"]
+            ]
+    except Exception:
+        # Missing, outdated or broken cache entries are simply ignored.
+        pass
+    return None
+
+
+def _write_toc_cache(cache_file: str, st: os.stat_result, toc: list) -> None:
+    # Only plain Python objects are stored, so that reading the cache
+    # never needs to import pymupdf (or this module).
+    plain_toc = [
+        [
+            lvl,
+            title,
+            page,
+            {
+                **{
+                    k: v
+                    for k, v in dest.items()
+                    if isinstance(v, _PLAIN_TYPES)
+                },
+                "to": tuple(dest["to"]),
+            },
+        ]
+        for lvl, title, page, dest in toc
+    ]
+    entry = {
+        "version": _TOC_CACHE_VERSION,
+        "mtime": st.st_mtime_ns,
+        "size": st.st_size,
+        "toc": plain_toc,
+    }
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        # Write to a temporary file first, so that concurrent readers
+        # never see a partially written entry.
+        tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+        with open(tmp_file, "wb") as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, cache_file)
+    except (OSError, pickle.PicklingError):
+        pass
+
+
 def get_toc(path: str, mupdf_coordinate_space: bool = False) -> list:
     """
-    Extract the table of contents from a PDF file.
+    Extract the table of contents from a PDF file. The coordinates of
+    the destination of every entry are stored as a `TocPoint` under the
+    key "to".
+
+    The result is cached on disk and reused as long as the modification
+    time and size of the file don't change.
+    """
+    return _get_toc(path, mupdf_coordinate_space)[0]
+
+
+def _get_toc(path: str, mupdf_coordinate_space: bool) -> tuple[list, bool]:
+    """
+    Same as `get_toc`, but additionally return whether the PDF file had
+    to be opened, i.e. whether the table of contents wasn't cached.
     """
+    st = os.stat(path)
+    cache_file = _toc_cache_file(path, mupdf_coordinate_space)
+    if (toc := _read_toc_cache(cache_file, st)) is not None:
+        return toc, False
+
+    # Importing pymupdf is rather slow, so we only do it once it is
+    # actually needed.
+    import pymupdf
+
     with pymupdf.open(path) as doc:
         toc = []
+        matrices: dict[int, tuple[float, ...]] = {}
         for t in doc.get_toc(simple=False):
-            page = doc.load_page(t[0])
-            # We try to access the coordinates of the entries at least
-            # once, even if we don't need to transform them to mupdf
-            # coordinates since this enables us to ensure that every
-            # entry has them.
-            try:
-                coords = t[3]["to"]
-            except KeyError:
-                coords = pymupdf.Point()
-
-            if mupdf_coordinate_space:
-                coords *= page.transformation_matrix
-            t[3]["to"] = coords
+            # We make sure that every entry has coordinates, even if we
+            # don't need to transform them to mupdf coordinates.
+            coords = t[3].get("to")
+            x, y = (coords.x, coords.y) if coords is not None else (0.0, 0.0)
+
+            # Loading a page is expensive, so we only do it if we actually
+            # need its transformation matrix and load every page at most
+            # once, since several entries often point to the same page.
+            # Only the matrix is kept, so the page itself can be freed
+            # right away. Note that TOC page numbers start at 1 and are -1
+            # for entries without a destination in the document.
+            if mupdf_coordinate_space and (page_no := t[2]) > 0:
+                matrix = matrices.get(page_no)
+                if matrix is None:
+                    matrix = matrices[page_no] = tuple(
+                        doc.load_page(page_no - 1).transformation_matrix
+                    )
+                # Apply the affine transformation directly instead of using
+                # `coords * matrix`, which converts the matrix anew for
+                # every single entry.
+                a, b, c, d, e, f = matrix
+                x, y = a * x + c * y + e, b * x + d * y + f
+            t[3]["to"] = TocPoint(x, y)
             toc.append(t)
-    return toc
+    _write_toc_cache(cache_file, st, toc)
+    return toc, True
+
+
+def get_tocs_batch(
+    paths: list[str],
+    mupdf_coordinate_space: bool = False,
+    chunk_size: int = 64,
+) -> list[list]:
+    """
+    Extract the tables of contents of several PDF files one after another,
+    e.g. in order to index them in advance.
+
+    After every `chunk_size` files, MuPDF's resource store (fonts, images,
+    ...) is emptied, in order to keep memory usage bounded for large
+    batches. This is skipped if all of these files were cached, in which
+    case pymupdf isn't even imported.
+    """
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size must be at least 1, not {chunk_size}")
+
+    tocs = []
+    for i in range(0, len(paths), chunk_size):
+        opened = False
+        for path in paths[i : i + chunk_size]:
+            toc, opened_path = _get_toc(path, mupdf_coordinate_space)
+            tocs.append(toc)
+            opened |= opened_path
+        if opened:
+            import pymupdf
+
+            pymupdf.TOOLS.store_shrink(100)
+    return tocs
+
+
+def get_tocs_parallel(
+    paths: list[str],
+    mupdf_coordinate_space: bool = False,
+    max_workers: Optional[int] = None,
+) -> list[list]:
+    """
+    Same as `get_tocs_batch`, but distribute the PDF files among several
+    processes. Processes are used instead of threads, since MuPDF only
+    releases the GIL within its native code.
+    """
+    # Importing this pulls in multiprocessing, which is not needed by the
+    # command line interface.
+    from concurrent.futures import ProcessPoolExecutor
+
+    workers = max_workers or os.cpu_count() or 1
+    # Send the paths in chunks, so that the cost of passing data between
+    # processes is spread over several files.
+    chunksize = max(1, len(paths) // (4 * workers))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(
+            executor.map(
+                get_toc,
+                paths,
+                repeat(mupdf_coordinate_space),
+                chunksize=chunksize,
+            )
+        )
 
 
 def open_pdf(
     path: str,
-    cmd: str,
-    position_args: Optional[str] = None,
+    cmd: Optional[list[str]],
+    position_args: Optional[list[str]] = None,
     position: Optional[list[int]] = None,
-) -> None:
+) -> NoReturn:
     """
     Open a PDF, optionally at a specific position (consisting of a list
     including the page number, x position and y position, in that order),
     with the by `cmd` specified viewer.
 
-    The string `position_args` specifies how the position parameters will
+    The arguments `position_args` specify how the position parameters will
     be passed to the pdf viewer, by replacing the substrings "$page", "$xloc",
     "$yloc" with the corresponding values.
 
     The default viewer is zathura.
+
+    Since opening the PDF is the last thing we do, the current process is
+    replaced by the viewer, instead of waiting for it to be closed.
     """
     if cmd is None:
-        cmd = "zathura"
-        position_args = "-P $page"
-    pos_strings = [r"\$page", r"\$xloc", r"\$yloc"]
-    if position is None:
-        try_running_subprocess(
-            shlex.split(cmd) + [path],
-            not_found_error=f"PDF viewer ({cmd}) not found!",
-        )
-    else:
-        if position_args:
-            for i in range(3):
-                position_args = re.sub(
-                    pos_strings[i], str(position[i]), position_args
-                )
-        else:
-            position_args = ""
-        try_running_subprocess(
-            shlex.split(cmd) + [path] + shlex.split(position_args),
-            not_found_error=f"PDF viewer ({cmd}) not found!",
-        )
+        cmd = ["zathura"]
+        position_args = ["-P", "$page"]
+    not_found_error = f"PDF viewer ({shlex.join(cmd)}) not found!"
+    argv = cmd + [path]
+    if position is not None:
+        argv += [
+            _POSITION_RE.sub(
+                lambda m: str(position[_POSITION_FIELDS[m.group(1)]]), arg
+            )
+            for arg in position_args or []
+        ]
+    if not cmd or (executable := _resolve(cmd[0])) is None:
+        send_error(not_found_error)
+
+    # The output of the viewer has always been hidden, so we keep it that
+    # way, but make sure that nothing we printed ourselves gets lost.
+    sys.stdout.flush()
+    sys.stderr.flush()
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    stdout, stderr = os.dup(1), os.dup(2)
+    os.dup2(devnull, 1)
+    os.dup2(devnull, 2)
+    try:
+        os.execv(executable, argv)
+    except OSError:
+        os.dup2(stdout, 1)
+        os.dup2(stderr, 2)
+        send_error(not_found_error)
 
 
 def main():
@@ -210,8 +708,16 @@ Have fun reading! :D"""
     parser.add_argument(
         "-hi",
         "--hidden",
-        help="""also search for hidden files (only relevant if `fd` is
-        installed and `--search-cmd` is not used)""",
+        help="""also search for hidden files (only relevant if `--search-cmd`
+        is not used)""",
+        action="store_true",
+    )
+    parser.add_argument(
+        "-gd",
+        "--getdents",
+        help="""read directories in large batches using the `getdents64`
+        syscall, which can be faster for huge directories (only relevant on
+        Linux and if `--search-cmd` is not used)""",
         action="store_true",
     )
     parser.add_argument(
@@ -251,7 +757,9 @@ Have fun reading! :D"""
     parser.add_argument(
         "-p",
         "--pdf-viewer",
-        help="command to launch for viewing pdf files (default: `zathura`)",
+        help="""command to launch for viewing pdf files (default: `zathura`).
+        Unless `--pdf-viewer-args` is given as well, the pdf is opened
+        without asking for a table of contents entry.""",
     )
     parser.add_argument(
         "-pa",
@@ -259,7 +767,8 @@ Have fun reading! :D"""
         help="""arguments to optionally provide to the pdf viewer for opening
         at a specific position. These can contain the strings '$page', '$xloc'
         and '$yloc' which will be replaced accordingly, cp. "example usage"
-        below.""",
+        below. Required for selecting a table of contents entry when using a
+        custom `--pdf-viewer`.""",
     )
     parser.add_argument(
         "-mc",
@@ -271,41 +780,61 @@ Have fun reading! :D"""
     parser.add_argument(
         "--search-cmd",
         help="""command to launch for searching pdf files
-        (overrides `--base-directory` and `--hidden`)""",
+        (overrides `--base-directory`, `--hidden` and `--getdents`)""",
     )
     args = parser.parse_args()
 
+    # Split all user supplied commands exactly once
+    selector = split_args(args.selector)
+    pdf_viewer = split_args(args.pdf_viewer)
+    pdf_viewer_args = split_args(args.pdf_viewer_args)
+
     # Find all PDFs in the specified directory
     if (b := args.base_directory) is not None:
         search_dir = b
     else:
         search_dir = expandvars("$HOME")
-    pdfs = search_pdfs(search_dir, cmd=args.search_cmd, hidden=args.hidden)
+    pdfs = search_pdfs(
+        search_dir,
+        cmd=split_args(args.search_cmd),
+        hidden=args.hidden,
+        getdents=args.getdents,
+    )
+    # Custom search commands might report the same file several times,
+    # e.g. when following symlinks, so we remove duplicates while
+    # preserving the order.
+    pdfs = list(dict.fromkeys(pdfs))
 
     # Let the user select a specific file
-    pdf_items = [p if args.full_path else re.sub(r".*/", "", p) for p in pdfs]
+    pdf_items = pdfs if args.full_path else [basename(p) for p in pdfs]
     selected_pdf = pdfs[
         select(
             pdf_items,
-            cmd=merge_strings(args.selector, args.pdf_selector_args),
+            cmd=merge_args(selector, split_args(args.pdf_selector_args)),
             indices=args.selector_indices,
         )
     ]
 
+    # Respect the users choice to not select a TOC entry via the relevant
+    # flag. The same applies if a custom pdf viewer is used without any
+    # arguments for passing the position, since it would be ignored anyway.
+    # In both cases, we don't even need to open the PDF.
+    if args.no_toc or (pdf_viewer is not None and pdf_viewer_args is None):
+        open_pdf(selected_pdf, cmd=pdf_viewer)
+
     # Extract the TOC
     toc = get_toc(selected_pdf, args.mupdf_coordinate_space)
 
     # If the PDF has no TOC, simply open it, otherwise ask the user for the
     # desired entry and open the file at the corresponding page.
-    # Also respect the users choice via the relevant flag.
-    if len(toc) == 0 or args.no_toc:
-        open_pdf(selected_pdf, cmd=args.pdf_viewer)
+    if len(toc) == 0:
+        open_pdf(selected_pdf, cmd=pdf_viewer)
     else:
         # If the selection does not work properly, e.g. because the user
         # cancels it, we simply open the PDF, without specifying a page.
         toc_index = select(
             [t[1] for t in toc],
-            cmd=merge_strings(args.selector, args.toc_selector_args),
+            cmd=merge_args(selector, split_args(args.toc_selector_args)),
             indices=args.selector_indices,
             check=False,
         )
@@ -314,12 +843,12 @@ Have fun reading! :D"""
             toc_position = [toc[toc_index][2], toc_point.x, toc_point.y]
             open_pdf(
                 selected_pdf,
-                cmd=args.pdf_viewer,
-                position_args=args.pdf_viewer_args,
+                cmd=pdf_viewer,
+                position_args=pdf_viewer_args,
                 position=toc_position,
             )
         else:
-            open_pdf(selected_pdf, cmd=args.pdf_viewer)
+            open_pdf(selected_pdf, cmd=pdf_viewer)
 
 
 if __name__ == "__main__":